@@ -0,0 +1,30 @@
+"""Add link and click composite indexes
+
+Revision ID: 5c1e7a92d4b3
+Revises: 38a9dee80e42
+Create Date: 2026-10-15 09:12:41.508317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e7a92d4b3'
+down_revision: Union[str, Sequence[str], None] = '38a9dee80e42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_links_user_created', 'links', ['user_id', sa.text('created_at DESC')], unique=False)
+    op.create_index('ix_clicks_link_clicked', 'clicks', ['link_id', 'clicked_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_clicks_link_clicked', table_name='clicks')
+    op.drop_index('ix_links_user_created', table_name='links')
@@ -1,21 +1,38 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import bcrypt
-from jose import JWTError, jwt
+import jwt
+from cachetools import TTLCache
 
 from db_config import settings
 
+# Decoded tokens keyed by the raw token string. The key includes the
+# signature, so a hit is equivalent to a successful verify.
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=5)
+_token_cache_lock = threading.Lock()
+
+# bcrypt releases the GIL while hashing, so one thread per core lets
+# logins run in parallel without starving the event loop
+bcrypt_pool = ThreadPoolExecutor(
+    max_workers=os.cpu_count(), thread_name_prefix="bcrypt"
+)
+
 
 def hash_password(password: str) -> str:
     """
     Hash a plaintext password using bcrypt.
 
+    Cost factor comes from settings.bcrypt_rounds.
     Returns hashed password suitable for database storage.
     """
 
     password_bytes = password.encode("utf-8")
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode("utf-8")
 
@@ -66,13 +83,31 @@ def decode_access_token(token: str) -> Optional[str]:
     Args:
         token: JWT token string
 
+    Results are cached for a few seconds so repeat requests with the
+    same token skip signature verification.
+
     Returns: Username from token, or None if invalid
     """
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+
+    if cached is not None:
+        username, expires_at = cached
+        if expires_at > time.time():
+            return username
+
     try:
         payload = jwt.decode(
             token, settings.secret_key, algorithms=[settings.algorithm]
         )
-        username: str = payload.get("sub")  # type: ignore
-        return username
-    except JWTError:
+    except jwt.InvalidTokenError:
         return None
+
+    username: str = payload.get("sub")  # type: ignore
+    expires_at = payload.get("exp")
+
+    if username is not None and expires_at is not None:
+        with _token_cache_lock:
+            _token_cache[token] = (username, expires_at)
+
+    return username
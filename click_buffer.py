@@ -0,0 +1,253 @@
+"""
+Buffered click recording.
+
+Redirects append clicks to a Redis stream instead of writing to Postgres.
+A background writer reads the stream in batches and stores each batch
+with a single COPY, so a burst of redirects costs one commit.
+"""
+
+import asyncio
+import os
+import socket
+from datetime import datetime, timezone
+
+from redis import asyncio as aioredis
+from redis.exceptions import ResponseError
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+import db_models
+from db_config import SessionLocal
+
+CLICK_STREAM_KEY = "clicks:stream"
+CLICK_GROUP = "click-writers"
+CLICK_BATCH_SIZE = 500
+CLICK_FLUSH_INTERVAL_MS = 1000
+
+# Entries another consumer read but never acknowledged (e.g. it crashed)
+# are taken over once they've been pending this long
+CLICK_CLAIM_IDLE_MS = 60_000
+
+# Entries that still fail after this many reads are moved to the
+# dead-letter stream, so one bad click can't stall the writer
+CLICK_MAX_DELIVERIES = 5
+CLICK_DEAD_LETTER_KEY = "clicks:dead"
+CLICK_DEAD_LETTER_MAXLEN = 10_000
+
+# Bounded columns, truncated on enqueue so a long value can't fail a batch
+REFERRER_MAX_LENGTH = db_models.Click.referrer.type.length
+IP_ADDRESS_MAX_LENGTH = db_models.Click.ip_address.type.length
+
+CLICK_COLUMNS = ("link_id", "clicked_at", "referrer", "user_agent", "ip_address")
+COPY_CLICKS_SQL = (
+    f"COPY {db_models.Click.__tablename__} ({', '.join(CLICK_COLUMNS)}) FROM STDIN"
+)
+
+
+async def enqueue_click(
+    redis_client: aioredis.Redis,
+    link_id: int,
+    referrer: str | None = None,
+    user_agent: str | None = None,
+    ip_address: str | None = None,
+):
+    """Append a click to the stream for the writer to store"""
+
+    fields = {"link_id": link_id, "clicked_at": datetime.now(timezone.utc).isoformat()}
+    # Stream fields can't hold None, so missing values are left out
+    if referrer is not None:
+        fields["referrer"] = referrer[:REFERRER_MAX_LENGTH]
+    if user_agent is not None:
+        fields["user_agent"] = user_agent
+    if ip_address is not None:
+        fields["ip_address"] = ip_address[:IP_ADDRESS_MAX_LENGTH]
+
+    await redis_client.xadd(CLICK_STREAM_KEY, fields)  # type: ignore
+
+
+async def ensure_click_group(redis_client: aioredis.Redis):
+    """Create the stream and its consumer group if they don't exist yet"""
+
+    try:
+        await redis_client.xgroup_create(
+            CLICK_STREAM_KEY, CLICK_GROUP, id="0", mkstream=True
+        )
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def _write_clicks(rows: list[dict]):
+    """Store a batch of clicks, skipping links deleted since the redirect"""
+
+    db = SessionLocal()
+    try:
+        link_ids = {row["link_id"] for row in rows}
+        existing = set(
+            db.scalars(select(db_models.Link.id).where(db_models.Link.id.in_(link_ids)))
+        )
+        rows = [row for row in rows if row["link_id"] in existing]
+        if rows:
+            # COPY streams the whole batch in one command, cheaper than
+            # even a multi-row INSERT
+            with db.connection().connection.cursor() as cursor:
+                with cursor.copy(COPY_CLICKS_SQL) as copy:
+                    for row in rows:
+                        copy.write_row([row[column] for column in CLICK_COLUMNS])
+            db.commit()
+    finally:
+        db.close()
+
+
+async def _store_entries(redis_client: aioredis.Redis, entries: list) -> int:
+    """Write stream entries to Postgres, then acknowledge and drop them"""
+
+    if not entries:
+        return 0
+
+    rows = [
+        {
+            "link_id": int(fields["link_id"]),
+            "clicked_at": datetime.fromisoformat(fields["clicked_at"]),
+            "referrer": fields.get("referrer"),
+            "user_agent": fields.get("user_agent"),
+            "ip_address": fields.get("ip_address"),
+        }
+        for _, fields in entries
+    ]
+    await run_in_threadpool(_write_clicks, rows)
+
+    entry_ids = [entry_id for entry_id, _ in entries]
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.xack(CLICK_STREAM_KEY, CLICK_GROUP, *entry_ids)
+        pipe.xdel(CLICK_STREAM_KEY, *entry_ids)
+        await pipe.execute()
+
+    return len(rows)
+
+
+async def claim_stale_clicks(redis_client: aioredis.Redis, consumer: str) -> int:
+    """Store clicks left pending by a consumer that stopped mid-batch"""
+
+    claimed = await redis_client.xautoclaim(
+        CLICK_STREAM_KEY,
+        CLICK_GROUP,
+        consumer,
+        min_idle_time=CLICK_CLAIM_IDLE_MS,
+        count=CLICK_BATCH_SIZE,
+    )
+    return await _store_entries(redis_client, claimed[1])
+
+
+async def flush_clicks(
+    redis_client: aioredis.Redis,
+    consumer: str,
+    block_ms: int | None = None,
+) -> int:
+    """
+    Store the next batch of buffered clicks.
+
+    Waits up to block_ms for new entries when given.
+    Returns the number of clicks read from the stream.
+    """
+    response = await redis_client.xreadgroup(
+        CLICK_GROUP,
+        consumer,
+        {CLICK_STREAM_KEY: ">"},
+        count=CLICK_BATCH_SIZE,
+        block=block_ms,
+    )
+    if not response:
+        return 0
+
+    _, entries = response[0]
+    return await _store_entries(redis_client, entries)
+
+
+async def retry_pending_clicks(redis_client: aioredis.Redis, consumer: str) -> bool:
+    """
+    Retry this consumer's pending clicks one at a time, after a failed batch.
+
+    Good entries are stored on their own, so one bad click can't hold back
+    the rest. Entries that keep failing are dead-lettered once read
+    CLICK_MAX_DELIVERIES times. Returns True if any are still pending.
+    """
+    response = await redis_client.xreadgroup(
+        CLICK_GROUP, consumer, {CLICK_STREAM_KEY: "0"}, count=CLICK_BATCH_SIZE
+    )
+    entries = response[0][1] if response else []
+    if not entries:
+        return False
+
+    pending = await redis_client.xpending_range(
+        CLICK_STREAM_KEY,
+        CLICK_GROUP,
+        min="-",
+        max="+",
+        count=CLICK_BATCH_SIZE,
+        consumername=consumer,
+    )
+    deliveries = {item["message_id"]: item["times_delivered"] for item in pending}
+
+    still_pending = False
+    for entry_id, fields in entries:
+        try:
+            await _store_entries(redis_client, [(entry_id, fields)])
+        except Exception as e:
+            if deliveries.get(entry_id, 0) < CLICK_MAX_DELIVERIES:
+                still_pending = True
+                continue
+            print(f"✗ Dead-lettering click {entry_id}: {e}")
+            async with redis_client.pipeline() as pipe:
+                pipe.xadd(
+                    CLICK_DEAD_LETTER_KEY,
+                    fields,
+                    maxlen=CLICK_DEAD_LETTER_MAXLEN,
+                    approximate=True,
+                )
+                pipe.xack(CLICK_STREAM_KEY, CLICK_GROUP, entry_id)
+                pipe.xdel(CLICK_STREAM_KEY, entry_id)
+                await pipe.execute()
+
+    return still_pending
+
+
+def consumer_name() -> str:
+    """Unique consumer name for this worker process"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def run_click_writer(redis_client: aioredis.Redis):
+    """Flush buffered clicks until cancelled, draining the stream on the way out"""
+
+    consumer = consumer_name()
+    ready = False
+    retry_pending = False
+    try:
+        while True:
+            try:
+                if not ready:
+                    await ensure_click_group(redis_client)
+                    await claim_stale_clicks(redis_client, consumer)
+                    ready = True
+                if retry_pending:
+                    retry_pending = await retry_pending_clicks(redis_client, consumer)
+                    if retry_pending:
+                        await asyncio.sleep(CLICK_FLUSH_INTERVAL_MS / 1000)
+                    continue
+                await flush_clicks(
+                    redis_client, consumer, block_ms=CLICK_FLUSH_INTERVAL_MS
+                )
+            except Exception as e:
+                # Unacknowledged entries stay pending and are retried one by one
+                print(f"✗ Click flush failed: {e}")
+                retry_pending = True
+                await asyncio.sleep(CLICK_FLUSH_INTERVAL_MS / 1000)
+    finally:
+        if ready:
+            try:
+                await retry_pending_clicks(redis_client, consumer)
+                while await flush_clicks(redis_client, consumer):
+                    pass
+            except Exception as e:
+                print(f"✗ Click flush on shutdown failed: {e}")
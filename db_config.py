@@ -7,11 +7,21 @@ This module handles:
 3. Providing database sessions
 """
 
+from typing import Optional
+
+from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 
+def use_psycopg_driver(url: str) -> str:
+    """Point plain postgresql:// URLs at the psycopg (v3) driver."""
+    if url.startswith("postgresql://"):
+        return "postgresql+psycopg://" + url.removeprefix("postgresql://")
+    return url
+
+
 class Settings(BaseSettings):
     """
     Application settings loaded from environment variables.
@@ -24,21 +34,56 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 10080
+    bcrypt_rounds: int = 12  # Tune with scripts/calibrate_bcrypt.py, never below 10
     redis_host: str = "localhost"
     redis_port: int = 6379
     redis_db: int = 0
+    redis_unix_socket_path: Optional[str] = None  # Use when Redis is colocated
+    redis_max_connections: int = 64
+    redis_warm_connections: int = 8
+    link_cache_ttl: int = 86400  # Max seconds cached; capped at the link's expiry
+    db_pool_size: int = 20
+    db_max_overflow: int = 40
+    db_pool_recycle: int = 1800  # Seconds before a connection is replaced
+    db_statement_timeout_ms: int = 5000
     environment: str = "development"
 
     model_config = SettingsConfigDict(env_file=".env")
 
+    @field_validator("bcrypt_rounds")
+    @classmethod
+    def bcrypt_rounds_minimum(cls, rounds: int) -> int:
+        if rounds < 10:
+            raise ValueError("BCRYPT_ROUNDS must be at least 10")
+        return rounds
+
+    @field_validator("database_url")
+    @classmethod
+    def database_url_driver(cls, url: str) -> str:
+        return use_psycopg_driver(url)
+
 
 # Singleton instance - created once, imported everywhere
 settings = Settings()  # type: ignore
 
 
+# No pre-ping: recycling plus TCP keepalives catches dead connections
+# without an extra SELECT 1 round trip on every checkout.
+# prepare_threshold: psycopg prepares a statement server-side after it has
+# run this many times on a connection, so Postgres skips parse/plan for
+# hot queries like the username and short_code lookups.
 engine = create_engine(
     settings.database_url,
-    pool_pre_ping=True,  # Test connections before using them
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=False,
+    connect_args={
+        "options": f"-c statement_timeout={settings.db_statement_timeout_ms}",
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "prepare_threshold": 3,
+    },
     echo=False,  # Set to True to see SQL queries (debug)
 )
 
@@ -54,6 +99,10 @@ def get_db():
     Provides a database session to route handlers.
     Automatically closes session when request completes.
 
+    Sessions are already lazy: no pool connection is checked out until
+    the first query, so requests that never touch the DB (e.g. a Redis
+    cache hit in get_current_user) don't pay for one.
+
     Usage in routes:
         def my_route(db: Session = Depends(get_db))
             ...
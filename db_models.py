@@ -1,4 +1,13 @@
-from sqlalchemy import TIMESTAMP, Boolean, Column, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    TIMESTAMP,
+    Boolean,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -44,6 +53,9 @@ class Link(Base):
         TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now()
     )
 
+    # Serves "user's links, newest first" as an index walk
+    __table_args__ = (Index("ix_links_user_created", user_id, created_at.desc()),)
+
     # Relationships
     owner = relationship("User", back_populates="links")
     clicks = relationship("Click", back_populates="link", cascade="all, delete-orphan")
@@ -67,5 +79,8 @@ class Click(Base):
     user_agent = Column(Text, nullable=True)
     ip_address = Column(String(45), nullable=True)
 
+    # Per-link click lookups and time-window counts
+    __table_args__ = (Index("ix_clicks_link_clicked", link_id, clicked_at),)
+
     # Relationship
     link = relationship("Link", back_populates="clicks")
@@ -1,3 +1,5 @@
+import orjson
+import redis
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
@@ -5,13 +7,20 @@ from sqlalchemy.orm import Session
 import auth
 import db_models
 from db_config import get_db
+from redis_config import get_redis
 
 security = HTTPBearer()
 
+# Cached users aren't invalidated: nothing updates or deletes user rows
+# today. Any endpoint that does (rename, deactivation, password change)
+# must delete user:{username}, or stale entries keep authenticating.
+USER_CACHE_TTL = 60
+
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db_session: Session = Depends(get_db),
+    redis_client: redis.Redis = Depends(get_redis),
 ) -> db_models.User:
     """
     Dependency to get the current authenticated user.
@@ -19,6 +28,9 @@ def get_current_user(
     Validates JWT token and returns User object.
     Raises 401 if token is invalid or user doesn't exist.
 
+    The user is cached in Redis for a short time, so most requests
+    get a detached User (id and username only) without a DB query.
+
     Usage in routes:
         def my_route(current_user: User = Depends(get_current_user)):
             # current_user is automatically populated
@@ -32,6 +44,12 @@ def get_current_user(
             detail="Could not validate credentials",
         )
 
+    cache_key = f"user:{username}"
+    cached_user = redis_client.get(cache_key)
+
+    if cached_user:
+        return db_models.User(**orjson.loads(cached_user))  # type: ignore
+
     user = (
         db_session.query(db_models.User)
         .filter(db_models.User.username == username)
@@ -43,4 +61,7 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found"
         )
 
+    cache_data = {"id": user.id, "username": user.username}
+    redis_client.setex(cache_key, USER_CACHE_TTL, orjson.dumps(cache_data))
+
     return user
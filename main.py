@@ -1,23 +1,39 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
-from redis_config import test_redis_connection
+from click_buffer import run_click_writer
+from redis_config import (
+    async_redis_client,
+    async_redis_pool,
+    test_redis_connection,
+    warm_redis_pool,
+)
 from routers import auth, links, redirect
 
 
 # Test Redis connection on startup
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Run on application startup."""
+    """Run on application startup and shutdown."""
     try:
         test_redis_connection()
+        warm_redis_pool()
         print("✓ Redis connected successfully")
     except Exception as e:
         print(f"✗ Redis connection failed: {e}")
         print("  Make sure Redis is running: sudo systemctl start redis")
+
+    # Clicks are buffered in Redis and written to Postgres in batches
+    click_writer = asyncio.create_task(run_click_writer(async_redis_client))
     yield
+    click_writer.cancel()
+    with suppress(asyncio.CancelledError):
+        await click_writer
+    await async_redis_pool.disconnect()
 
 
 app = FastAPI(
@@ -25,9 +41,16 @@ app = FastAPI(
     description="Fast, cached URL shortening service",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     swagger_ui_parameters={"persistAuthorization": True},
 )
 
+# Read by the redirect middleware, which runs before dependency injection
+app.state.async_redis = async_redis_client
+
+# Answers cached redirects before routing; added first so CORS still wraps it
+app.add_middleware(redirect.CachedRedirectMiddleware)
+
 # CORS configuration (allows frontend to call API)
 app.add_middleware(
     CORSMiddleware,
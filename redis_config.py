@@ -5,34 +5,130 @@ Redis will store: short_code -> original_url mappings
 Goal: Sub-millisecond redirect lookups
 """
 
+import socket
+from datetime import datetime, timezone
+
 import redis
+from redis import asyncio as aioredis
 
 from db_config import settings
 
-redis_client = redis.Redis(
-    host=settings.redis_host,
-    port=settings.redis_port,
-    db=settings.redis_db,
-    decode_responses=True,
-    socket_connect_timeout=5,
-    socket_timeout=5,
+
+def _keepalive_options() -> dict:
+    """TCP keepalive tuning, for the options this platform supports."""
+    options = {}
+    for name, value in (
+        ("TCP_KEEPIDLE", 60),
+        ("TCP_KEEPINTVL", 10),
+        ("TCP_KEEPCNT", 3),
+    ):
+        if hasattr(socket, name):
+            options[getattr(socket, name)] = value
+    return options
+
+
+def _connection_kwargs(unix_socket_class, tcp_class) -> dict:
+    """Pool arguments shared by the sync and asyncio clients."""
+    if settings.redis_unix_socket_path:
+        return {
+            "connection_class": unix_socket_class,
+            "path": settings.redis_unix_socket_path,
+            "db": settings.redis_db,
+            "decode_responses": True,
+            "socket_timeout": 5,
+        }
+    return {
+        "connection_class": tcp_class,
+        "host": settings.redis_host,
+        "port": settings.redis_port,
+        "db": settings.redis_db,
+        "decode_responses": True,
+        "socket_connect_timeout": 5,
+        "socket_timeout": 5,
+        "socket_keepalive": True,
+        "socket_keepalive_options": _keepalive_options(),
+    }
+
+
+# Bounded pool: requests wait for a free connection instead of opening
+# new ones without limit. A UNIX socket skips the TCP stack entirely.
+redis_pool = redis.BlockingConnectionPool(
+    max_connections=settings.redis_max_connections,
+    timeout=5,
+    **_connection_kwargs(redis.UnixDomainSocketConnection, redis.Connection),
+)
+
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+# Same settings for async routes, so Redis I/O doesn't block the event loop
+async_redis_pool = aioredis.BlockingConnectionPool(
+    max_connections=settings.redis_max_connections,
+    timeout=5,
+    **_connection_kwargs(aioredis.UnixDomainSocketConnection, aioredis.Connection),
 )
 
+async_redis_client = aioredis.Redis(connection_pool=async_redis_pool)
 
-def get_redis():
+
+def link_cache_ttl(expires_at: datetime | None) -> int | None:
+    """
+    Seconds a cached link entry may live.
+
+    Capped at the link's own expiry so Redis evicts it on time.
+    Returns None when the link has already expired and shouldn't be cached.
+    """
+    if expires_at is None:
+        return settings.link_cache_ttl
+
+    remaining = int((expires_at - datetime.now(timezone.utc)).total_seconds())
+    if remaining <= 0:
+        return None
+    return min(remaining, settings.link_cache_ttl)
+
+
+def cache_link(pipe, short_code: str, link_id: int, url: str, ttl: int):
+    """
+    Queue the commands that cache a link on a sync or asyncio pipeline.
+
+    Links are stored as a hash of id and url, read back with HMGET.
+    The delete replaces entries left in the older JSON string format.
+    Use a transactional pipeline so the entry never exists without a TTL.
+    """
+    cache_key = f"link:{short_code}"
+    pipe.delete(cache_key)
+    pipe.hset(cache_key, mapping={"id": link_id, "url": url})
+    pipe.expire(cache_key, ttl)
+
+
+async def get_redis():
     """
     Dependency function for FastAPI routes.
 
-    Returns the Redis client.
+    Returns the shared Redis client.
     Doesn't need try/finally like database because Redis
     client manages its own connection pool.
 
+    Declared async so FastAPI resolves it on the event loop
+    instead of dispatching to the threadpool on every request.
+
     Usage:
         def my_route(redis: redis.Redis = Depends(get_redis)):
     """
     return redis_client
 
 
+async def get_async_redis():
+    """
+    Dependency function for async routes.
+
+    Returns the asyncio Redis client; commands must be awaited.
+
+    Usage:
+        async def my_route(redis: aioredis.Redis = Depends(get_async_redis)):
+    """
+    return async_redis_client
+
+
 def test_redis_connection():
     """
     Test Redis connection on startup.
@@ -43,3 +139,15 @@ def test_redis_connection():
         return True
     except redis.ConnectionError as e:
         raise RuntimeError(f"Could not connect to Redis: {e}") from e
+
+
+def warm_redis_pool():
+    """
+    Open connections ahead of traffic so early requests
+    don't pay for the TCP handshake.
+    """
+    connections = [
+        redis_pool.get_connection() for _ in range(settings.redis_warm_connections)
+    ]
+    for connection in connections:
+        redis_pool.release(connection)
@@ -1,10 +1,16 @@
 """
 Authentication endpoints: register and login.
+
+Handlers are async so bcrypt work can be handed to auth.bcrypt_pool,
+while database calls run in the regular threadpool.
 """
 
+import asyncio
 from datetime import timedelta
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 import auth
@@ -15,45 +21,46 @@ from db_config import get_db, settings
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
-@router.post(
-    "/register", response_model=models.UserResponse, status_code=status.HTTP_201_CREATED
-)
-def register_user(user_data: models.UserCreate, db_session: Session = Depends(get_db)):
-    """
-    Register a new user account.
-
-    Checks for username/email conflicts before creating.
-    Returns user data (no password).
-    """
-    # Check if username exists
-    existing_user = (
+def _get_user_by_username(
+    db_session: Session, username: str
+) -> Optional[db_models.User]:
+    return (
         db_session.query(db_models.User)
-        .filter(db_models.User.username == user_data.username)
+        .filter(db_models.User.username == username)
         .first()
     )
 
-    if existing_user:
+
+def _check_user_conflicts(db_session: Session, user_data: models.UserCreate):
+    """Raise if the username or email is already taken."""
+    # One query for both checks, then work out which one matched
+    conflicts = (
+        db_session.query(db_models.User.username, db_models.User.email)
+        .filter(
+            (db_models.User.username == user_data.username)
+            | (db_models.User.email == user_data.email)
+        )
+        .all()
+    )
+
+    if any(username == user_data.username for username, _ in conflicts):
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Username already taken"
         )
 
-    # Check if email exists
-    existing_email = (
-        db_session.query(db_models.User)
-        .filter(db_models.User.email == user_data.email)
-        .first()
-    )
-
-    if existing_email:
+    if conflicts:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
         )
 
-    # Create new user
+
+def _create_user(
+    db_session: Session, user_data: models.UserCreate, hashed_password: str
+) -> db_models.User:
     new_user = db_models.User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=auth.hash_password(user_data.password),
+        hashed_password=hashed_password,
     )
 
     db_session.add(new_user)
@@ -63,18 +70,41 @@ def register_user(user_data: models.UserCreate, db_session: Session = Depends(ge
     return new_user
 
 
+@router.post(
+    "/register", response_model=models.UserResponse, status_code=status.HTTP_201_CREATED
+)
+async def register_user(
+    user_data: models.UserCreate, db_session: Session = Depends(get_db)
+):
+    """
+    Register a new user account.
+
+    Checks for username/email conflicts before creating.
+    Returns user data (no password).
+    """
+    await run_in_threadpool(_check_user_conflicts, db_session, user_data)
+
+    loop = asyncio.get_running_loop()
+    hashed_password = await loop.run_in_executor(
+        auth.bcrypt_pool, auth.hash_password, user_data.password
+    )
+
+    # Create new user
+    return await run_in_threadpool(_create_user, db_session, user_data, hashed_password)
+
+
 @router.post("/login", response_model=models.Token)
-def login_user(user_data: models.UserLogin, db_session: Session = Depends(get_db)):
+async def login_user(
+    user_data: models.UserLogin, db_session: Session = Depends(get_db)
+):
     """
     Login with username and password.
 
     Returns JWT token for authentication.
     """
     # Find user
-    user = (
-        db_session.query(db_models.User)
-        .filter(db_models.User.username == user_data.username)
-        .first()
+    user = await run_in_threadpool(
+        _get_user_by_username, db_session, user_data.username
     )
 
     if not user:
@@ -84,7 +114,15 @@ def login_user(user_data: models.UserLogin, db_session: Session = Depends(get_db
         )
 
     # Verify password
-    if not auth.verify_password(user_data.password, user.hashed_password):  # type: ignore
+    loop = asyncio.get_running_loop()
+    password_valid = await loop.run_in_executor(
+        auth.bcrypt_pool,
+        auth.verify_password,
+        user_data.password,
+        user.hashed_password,
+    )
+
+    if not password_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
@@ -1,22 +1,127 @@
-import json
+import time
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Optional
 
+import orjson
 import redis
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy import delete, exists, lambda_stmt, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
 import db_models
 from db_config import get_db
 from dependencies import get_current_user
 from models import ClickResponse, ClickStats, LinkCreate, LinkResponse, LinkUpdate
-from redis_config import get_redis
+from redis_config import cache_link, get_redis, link_cache_ttl
 from utils.short_code import generate_short_code, is_valid_custom_code
 
 link_router = APIRouter(prefix="/links", tags=["links"])
 click_router = APIRouter(prefix="/clicks", tags=["clicks"])
 
+LINK_LIST_ADAPTER = TypeAdapter(list[LinkResponse])
+
+MAX_SHORT_CODE_ATTEMPTS = 3
+STATS_CACHE_TTL = 300
+
+# Every short code in use, for quick collision checks
+SHORT_CODES_KEY = "shortcodes:all"
+
+# Counts and top referrers from one pass over the user's clicks. The CTE is
+# referenced twice, so Postgres materializes it instead of joining twice.
+STATS_QUERY = text("""
+    WITH user_clicks AS (
+        SELECT c.clicked_at, c.referrer
+        FROM clicks c
+        JOIN links l ON l.id = c.link_id
+        WHERE l.user_id = :user_id
+    ),
+    totals AS (
+        SELECT
+            count(*) AS total,
+            count(*) FILTER (WHERE clicked_at >= :today_start) AS today,
+            count(*) FILTER (WHERE clicked_at >= :week_start) AS week,
+            count(*) FILTER (WHERE clicked_at >= :month_start) AS month
+        FROM user_clicks
+    ),
+    referrers AS (
+        SELECT referrer, count(*) AS referrer_count
+        FROM user_clicks
+        WHERE referrer IS NOT NULL
+        GROUP BY referrer
+        ORDER BY referrer_count DESC
+        LIMIT 5
+    )
+    SELECT totals.*, referrers.referrer, referrers.referrer_count
+    FROM totals
+    LEFT JOIN referrers ON true
+    ORDER BY referrers.referrer_count DESC NULLS LAST
+    """)
+
+
+def _stats_bucket() -> int:
+    """Current stats cache period, as a count of STATS_CACHE_TTL intervals"""
+    return int(time.time()) // STATS_CACHE_TTL
+
+
+def _stats_cache_key(user_id: int, bucket: int) -> str:
+    """Redis key for a user's cached click stats in one cache period"""
+    return f"stats:user_{user_id}:{bucket}"
+
+
+@lru_cache(maxsize=1)
+def _stats_windows(bucket: int) -> tuple[datetime, datetime, datetime]:
+    """
+    Start of today, the last week and the last month.
+
+    Buckets divide a day evenly, so every request in a bucket shares the
+    same boundaries and they only need computing once.
+    """
+    bucket_start = datetime.fromtimestamp(bucket * STATS_CACHE_TTL, timezone.utc)
+    today_start = bucket_start.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today_start - timedelta(days=7)
+    month_start = today_start - timedelta(days=30)
+    return today_start, week_start, month_start
+
+
+def _insert_link(
+    db_session: Session, short_code: str, values: dict
+) -> Optional[db_models.Link]:
+    """
+    Insert a link unless the short code is taken.
+
+    ON CONFLICT DO NOTHING makes the uniqueness check and the insert one
+    atomic statement. Returns None when the code already exists.
+    """
+    stmt = (
+        pg_insert(db_models.Link)
+        .values(short_code=short_code, **values)
+        .on_conflict_do_nothing(index_elements=["short_code"])
+        .returning(db_models.Link)
+    )
+    return db_session.scalars(stmt).first()
+
+
+def _raise_link_not_owned(db_session: Session, link_id: int, action: str):
+    """
+    Raise the right error after a write matched no owned link.
+
+    Only this failure path pays for the extra query telling 404 from 403.
+    """
+    link_exists = db_session.scalar(
+        select(exists().where(db_models.Link.id == link_id))
+    )
+    if not link_exists:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Link not found"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Not authorized to {action} this link",
+    )
+
 
 @link_router.post("", response_model=LinkResponse, status_code=status.HTTP_201_CREATED)
 def create_link(
@@ -26,6 +131,13 @@ def create_link(
     redis_client: redis.Redis = Depends(get_redis),
 ):
     """Create a short link"""
+    link_values = {
+        "user_id": current_user.id,
+        "original_url": str(link_data.original_url),
+        "custom_code": link_data.custom_code is not None,
+        "expires_at": link_data.expires_at,
+    }
+
     if link_data.custom_code:
         if not is_valid_custom_code(link_data.custom_code):
             raise HTTPException(
@@ -33,61 +145,49 @@ def create_link(
                 detail="Invalid custom code format",
             )
 
-        existing_link = (
-            db_session.query(db_models.Link)
-            .filter(db_models.Link.short_code == link_data.custom_code)
-            .first()
-        )
+        # Postgres decides, not the Redis set: the set can keep codes whose
+        # rows are gone, and a custom code has no other candidate to fall to
+        new_link = _insert_link(db_session, link_data.custom_code, link_values)
 
-        if existing_link:
+        if new_link is None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="Custom link code already exists",
             )
-        short_code = link_data.custom_code
     else:
-        max_attempts = 3
-        short_code = None
-
-        for _ in range(max_attempts):
-            candidate = generate_short_code(6)
-
-            existing = (
-                db_session.query(db_models.Link)
-                .filter(db_models.Link.short_code == candidate)
-                .first()
-            )
-            if not existing:
-                short_code = candidate
+        new_link = None
+        candidates = [generate_short_code(6) for _ in range(MAX_SHORT_CODE_ATTEMPTS)]
+
+        # Skip candidates Redis already knows are taken. The set may miss
+        # older codes, so the insert's ON CONFLICT is still the real check.
+        known_taken = redis_client.smismember(SHORT_CODES_KEY, candidates)
+
+        for candidate, taken in zip(candidates, known_taken):  # type: ignore
+            if taken:
+                continue
+            new_link = _insert_link(db_session, candidate, link_values)
+            if new_link is not None:
                 break
 
-        if short_code is None:
+        if new_link is None:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Could not generate unique short code afer multiple attempts",
             )
 
-    new_link = db_models.Link(
-        user_id=current_user.id,
-        short_code=short_code,
-        original_url=str(link_data.original_url),
-        custom_code=link_data.custom_code is not None,
-        expires_at=link_data.expires_at,
-    )
-
-    db_session.add(new_link)
+    # Build the response before commit expires the instance, saving a refresh
+    response = LinkResponse.model_validate(new_link)
     db_session.commit()
-    db_session.refresh(new_link)
 
-    cache_key = f"link:{short_code}"
-    cache_data = {
-        "id": new_link.id,
-        "url": str(new_link.original_url),
-        "expires_at": new_link.expires_at.isoformat() if new_link.expires_at else None,  # type: ignore
-    }
-    redis_client.set(cache_key, json.dumps(cache_data))
+    short_code = response.short_code
+    cache_ttl = link_cache_ttl(response.expires_at)
+    with redis_client.pipeline() as pipe:
+        if cache_ttl is not None:
+            cache_link(pipe, short_code, response.id, response.original_url, cache_ttl)
+        pipe.sadd(SHORT_CODES_KEY, short_code)
+        pipe.execute()
 
-    return new_link
+    return response
 
 
 @link_router.get("", response_model=list[LinkResponse])
@@ -102,16 +202,33 @@ def get_links(
 
     Returns links ordered by creation date
     """
-    links = (
-        db_session.query(db_models.Link)
-        .filter(db_models.Link.user_id == current_user.id)
+    # Plain rows instead of ORM objects: no identity map or instrumentation
+    user_id = current_user.id
+
+    # lambda_stmt caches the built statement; only the bound values change
+    stmt = lambda_stmt(
+        lambda: select(
+            db_models.Link.id,
+            db_models.Link.user_id,
+            db_models.Link.short_code,
+            db_models.Link.original_url,
+            db_models.Link.custom_code,
+            db_models.Link.expires_at,
+            db_models.Link.created_at,
+            db_models.Link.updated_at,
+        )
+        .where(db_models.Link.user_id == user_id)
         .order_by(db_models.Link.created_at.desc())
         .offset(skip)
         .limit(limit)
-        .all()
     )
+    rows = db_session.execute(stmt).mappings().all()
 
-    return links
+    # Validate and serialize in one pydantic-core pass, skipping jsonable_encoder
+    return Response(
+        content=LINK_LIST_ADAPTER.dump_json(LINK_LIST_ADAPTER.validate_python(rows)),
+        media_type="application/json",
+    )
 
 
 @click_router.get("/stats", response_model=ClickStats)
@@ -122,65 +239,44 @@ def get_click_stats(
 ):
     """Get aggregated click stats per user"""
 
-    cache_key = f"stats:user_{current_user.id}"
+    bucket = _stats_bucket()
+    cache_key = _stats_cache_key(current_user.id, bucket)  # type: ignore
     cached_stats = redis_client.get(cache_key)
 
     if cached_stats:
-        stats_dict = json.loads(cached_stats)  # type: ignore
-        return stats_dict
-
-    now = datetime.now(timezone.utc)
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    week_start = today_start - timedelta(days=7)
-    month_start = today_start - timedelta(days=30)
-
-    def user_clicks():
-        """Returns a base query for user's clicks"""
-        return (
-            db_session.query(db_models.Click)
-            .join(db_models.Link)
-            .filter(db_models.Link.user_id == current_user.id)
-        )
-
-    total_clicks = user_clicks().count()
-    clicks_today = (
-        user_clicks().filter(db_models.Click.clicked_at >= today_start).count()
-    )
-    clicks_this_week = (
-        user_clicks().filter(db_models.Click.clicked_at >= week_start).count()
-    )
-    clicks_this_month = (
-        user_clicks().filter(db_models.Click.clicked_at >= month_start).count()
-    )
-
-    referrers_results = (
-        db_session.query(
-            db_models.Click.referrer, func.count(db_models.Click.id).label("count")
-        )
-        .join(db_models.Link)
-        .filter(
-            db_models.Link.user_id == current_user.id,
-            db_models.Click.referrer.isnot(None),
-        )
-        .group_by(db_models.Click.referrer)
-        .order_by(func.count(db_models.Click.id).desc())
-        .limit(5)
-        .all()
-    )
-
+        # Cached bytes are already the response body, so send them as-is
+        # (response_model documents the shape but isn't applied here)
+        return Response(content=cached_stats, media_type="application/json")
+
+    today_start, week_start, month_start = _stats_windows(bucket)
+
+    rows = db_session.execute(
+        STATS_QUERY,
+        {
+            "user_id": current_user.id,
+            "today_start": today_start,
+            "week_start": week_start,
+            "month_start": month_start,
+        },
+    ).all()
+
+    # Every row repeats the totals; referrer columns are NULL when there are none
+    counts = rows[0]
     top_referrers = [
-        {"referrer": ref, "count": count} for ref, count in referrers_results
+        {"referrer": row.referrer, "count": row.referrer_count}
+        for row in rows
+        if row.referrer is not None
     ]
 
     stats = {
-        "total_clicks": total_clicks,
-        "clicks_today": clicks_today,
-        "clicks_this_week": clicks_this_week,
-        "clicks_this_month": clicks_this_month,
+        "total_clicks": counts.total,
+        "clicks_today": counts.today,
+        "clicks_this_week": counts.week,
+        "clicks_this_month": counts.month,
         "top_referrers": top_referrers,
     }
 
-    redis_client.setex(cache_key, 300, json.dumps(stats))
+    redis_client.setex(cache_key, STATS_CACHE_TTL, orjson.dumps(stats))
 
     return stats
 
@@ -195,47 +291,50 @@ def update_link(
 ):
     """Update a link's URL or expiration time"""
 
-    link = db_session.query(db_models.Link).filter(db_models.Link.id == link_id).first()
-
-    if not link:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Link not found"
-        )
-
-    if link.user_id != current_user.id:  # type: ignore
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to modify this link",
-        )
-
-    updated = False
-
+    values = {}
     if link_data.original_url is not None:
-        link.original_url = str(link_data.original_url)  # type: ignore
-        updated = True
-
+        values["original_url"] = str(link_data.original_url)
     if link_data.expires_at is not None:
-        link.expires_at = link_data.expires_at  # type: ignore
-        updated = True
+        values["expires_at"] = link_data.expires_at
+
+    owned = (db_models.Link.id == link_id, db_models.Link.user_id == current_user.id)
 
-    if not updated:
+    if not values:
+        link = db_session.scalars(select(db_models.Link).where(*owned)).first()
+        if link is None:
+            _raise_link_not_owned(db_session, link_id, "modify")
         return link
 
-    link.updated_at = datetime.now(timezone.utc)  # type: ignore
+    values["updated_at"] = datetime.now(timezone.utc)
 
-    db_session.commit()
-    db_session.refresh(link)
+    # Ownership is part of the WHERE clause, so one statement checks and updates
+    stmt = (
+        update(db_models.Link).where(*owned).values(**values).returning(db_models.Link)
+    )
+    link = db_session.scalars(stmt).first()
 
-    cache_key = f"link:{link.short_code}"
-    cache_data = {
-        "id": link.id,
-        "url": link.original_url,
-        "expires_at": link.expires_at.isoformat() if link.expires_at else None,  # type: ignore
-    }
+    if link is None:
+        _raise_link_not_owned(db_session, link_id, "modify")
+
+    response = LinkResponse.model_validate(link)
+    db_session.commit()
 
-    redis_client.set(cache_key, json.dumps(cache_data))
+    # An expiry moved into the past drops the entry so redirects see the DB
+    cache_ttl = link_cache_ttl(response.expires_at)
+    if cache_ttl is None:
+        redis_client.delete(f"link:{response.short_code}")
+    else:
+        with redis_client.pipeline() as pipe:
+            cache_link(
+                pipe,
+                response.short_code,
+                response.id,
+                response.original_url,
+                cache_ttl,
+            )
+            pipe.execute()
 
-    return link
+    return response
 
 
 @link_router.delete("/{link_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -247,46 +346,72 @@ def delete_link(
 ):
     """Delete a link and invalidate its cache"""
 
-    link = db_session.query(db_models.Link).filter(db_models.Link.id == link_id).first()
-
-    if not link:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Link not found"
-        )
-
-    if link.user_id != current_user.id:  # type: ignore
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not authorized to delete this link",
-        )
+    # Bulk delete: the clicks FK is ON DELETE CASCADE, so Postgres removes
+    # them without the ORM loading each one first
+    stmt = (
+        delete(db_models.Link)
+        .where(db_models.Link.id == link_id, db_models.Link.user_id == current_user.id)
+        .returning(db_models.Link.short_code)
+    )
+    short_code = db_session.execute(stmt).scalar()
 
-    cache_key = f"link:{link.short_code}"
-    redis_client.delete(cache_key)
+    if short_code is None:
+        _raise_link_not_owned(db_session, link_id, "delete")
 
-    db_session.delete(link)
     db_session.commit()
 
+    # Deleting a link removes its clicks, so the owner's stats are stale too
+    with redis_client.pipeline(transaction=False) as pipe:
+        pipe.delete(f"link:{short_code}")
+        pipe.srem(SHORT_CODES_KEY, short_code)  # type: ignore
+        pipe.delete(_stats_cache_key(current_user.id, _stats_bucket()))  # type: ignore
+        pipe.execute()
+
 
 @click_router.get("/{link_id}", response_model=list[ClickResponse])
 def get_clicks(
     link_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
     db_session: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user),
 ):
-    """Get all clicks for a link"""
-    link = db_session.query(db_models.Link).filter(db_models.Link.id == link_id).first()
+    """
+    Get clicks for a link
+
+    Returns most recent clicks first
+    """
+    owner_id = (
+        db_session.query(db_models.Link.user_id)
+        .filter(db_models.Link.id == link_id)
+        .scalar()
+    )
 
-    if not link:
+    if owner_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Links not found"
         )
 
-    if link.user_id != current_user.id:  # type: ignore
+    if owner_id != current_user.id:  # type: ignore
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this link",
         )
 
-    clicks = link.clicks
+    # Only the columns ClickResponse needs, not the full ORM rows
+    clicks = (
+        db_session.query(
+            db_models.Click.id,
+            db_models.Click.link_id,
+            db_models.Click.clicked_at,
+            db_models.Click.referrer,
+            db_models.Click.user_agent,
+        )
+        .filter(db_models.Click.link_id == link_id)
+        .order_by(db_models.Click.clicked_at.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
 
     return clicks
@@ -1,39 +1,111 @@
-import json
 from datetime import datetime, timezone
+from functools import lru_cache
+from urllib.parse import quote
 
-import redis
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
+from redis import asyncio as aioredis
+from redis.exceptions import ResponseError
+from sqlalchemy import lambda_stmt, select
 from sqlalchemy.orm import Session
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 import db_models
-from db_config import SessionLocal, get_db
-from redis_config import get_redis
+from click_buffer import enqueue_click
+from db_config import get_db
+from redis_config import cache_link, get_async_redis, link_cache_ttl
 
 router = APIRouter(tags=["Redirect"])
 
-
-def record_click(
-    link_id: int,
-    referrer: str | None = None,
-    user_agent: str | None = None,
-    ip_address: str | None = None,
-):
-    """Record a click in the database"""
-
-    db = SessionLocal()
-    try:
-        click = db_models.Click(
-            link_id=link_id,
-            clicked_at=datetime.now(timezone.utc),
-            referrer=referrer,
-            user_agent=user_agent,
-            ip_address=ip_address,
+REDIRECT_HEADERS_CACHE_SIZE = 4096
+EMPTY_BODY_MESSAGE = {"type": "http.response.body", "body": b""}
+
+
+class CachedRedirectMiddleware:
+    """
+    Serve cached redirects before routing.
+
+    A hit costs one Redis HMGET: no dependency resolution and no database
+    session. Misses, and paths that belong to other routes, fall through
+    to the app, where redirect_to_url reads the database and fills the cache.
+
+    It runs before dependency injection, so it reads its Redis client from
+    app.state.async_redis rather than from get_async_redis.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.reserved_paths: frozenset[str] | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        short_code = scope["path"][1:]
+        if not _looks_like_short_code(short_code) or self._is_reserved(scope):
+            await self.app(scope, receive, send)
+            return
+
+        redis_client: aioredis.Redis = scope["app"].state.async_redis
+        try:
+            link_id, url = await redis_client.hmget(f"link:{short_code}", "id", "url")
+        except ResponseError:
+            # An entry in the older string format; the router replaces it
+            link_id = url = None
+
+        if url is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Entries are written with a TTL capped at the link's expiry, so
+        # anything still in Redis is safe to redirect to
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status.HTTP_302_FOUND,
+                "headers": _redirect_headers(url),
+            }
         )
-        db.add(click)
-        db.commit()
-    finally:
-        db.close()
+        await send(EMPTY_BODY_MESSAGE)
+
+        headers = Headers(scope=scope)
+        client = scope.get("client")
+        await enqueue_click(
+            redis_client,
+            int(link_id),  # type: ignore
+            headers.get("referer"),
+            headers.get("user-agent"),
+            client[0] if client else None,
+        )
+
+    def _is_reserved(self, scope: Scope) -> bool:
+        """Whether the path is a static route, like /health or /links"""
+        if self.reserved_paths is None:
+            self.reserved_paths = frozenset(
+                route.path
+                for route in scope["app"].routes
+                if "{" not in getattr(route, "path", "{")
+            )
+        return scope["path"] in self.reserved_paths
+
+
+@lru_cache(maxsize=REDIRECT_HEADERS_CACHE_SIZE)
+def _redirect_headers(url: str) -> tuple[tuple[bytes, bytes], ...]:
+    """
+    Raw 302 headers for a URL, encoded the way RedirectResponse does it.
+
+    Memoized, so hot links reuse the same headers on every hit. A tuple,
+    so middleware further out can't modify the shared copy.
+    """
+    location = quote(url, safe=":/%#?=@[]!$&'()*+,;")
+    return ((b"location", location.encode("latin-1")), (b"content-length", b"0"))
+
+
+def _looks_like_short_code(value: str) -> bool:
+    """Cheap shape check: generated and custom codes are 3-10 alphanumerics"""
+    return 3 <= len(value) <= 10 and value.isascii() and value.isalnum()
 
 
 @router.get("/{short_code}")
@@ -41,65 +113,50 @@ async def redirect_to_url(
     short_code: str,
     request: Request,
     background_tasks: BackgroundTasks,
-    redis_client: redis.Redis = Depends(get_redis),
+    redis_client: aioredis.Redis = Depends(get_async_redis),
     db_session: Session = Depends(get_db),
 ):
-    """Redirect short code to original URL"""
+    """Redirect short code to original URL, caching it for next time"""
 
     referrer = request.headers.get("referer")
     user_agent = request.headers.get("user-agent")
     ip_address = request.client.host if request.client else None
 
-    cache_key = f"link:{short_code}"
-    cache_data = redis_client.get(cache_key)
-
-    if cache_data:
-
-        data = json.loads(cache_data)  # type: ignore
-        link_id = data["id"]
-        url = data["url"]
-        expires_at = data["expires_at"]
-
-        if expires_at:
-            expires_dt = datetime.fromisoformat(expires_at)
-            if expires_dt < datetime.now(timezone.utc):
-                redis_client.delete(cache_key)
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND, detail="Link has expired"
-                )
+    # Cache hits are answered by CachedRedirectMiddleware, so this path
+    # only runs on a miss
 
-        background_tasks.add_task(
-            record_click, link_id, referrer, user_agent, ip_address
-        )
-
-        return RedirectResponse(url=url, status_code=status.HTTP_302_FOUND)  # type: ignore
-
-    link = (
-        db_session.query(db_models.Link)
-        .filter(db_models.Link.short_code == short_code)
-        .first()
+    # Only the columns the redirect needs, as a plain row rather than an ORM
+    # instance. lambda_stmt caches the built statement; short_code is bound.
+    stmt = lambda_stmt(
+        lambda: select(
+            db_models.Link.id, db_models.Link.original_url, db_models.Link.expires_at
+        ).where(db_models.Link.short_code == short_code)
     )
+    link = db_session.execute(stmt).first()
 
     if not link:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Link not found"
         )
 
-    if link.expires_at and link.expires_at < datetime.now(timezone.utc):  # type: ignore
+    if link.expires_at and link.expires_at < datetime.now(timezone.utc):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Link has expired"
         )
 
-    new_cache_data = {
-        "id": link.id,
-        "url": link.original_url,
-        "expires_at": link.expires_at.isoformat() if link.expires_at else None,  # type: ignore
-    }
-
-    redis_client.set(cache_key, json.dumps(new_cache_data))  # type: ignore
+    cache_ttl = link_cache_ttl(link.expires_at)
+    if cache_ttl is not None:
+        async with redis_client.pipeline() as pipe:
+            cache_link(pipe, short_code, link.id, link.original_url, cache_ttl)
+            await pipe.execute()
 
     background_tasks.add_task(
-        record_click, link.id, referrer, user_agent, ip_address  # type: ignore
+        enqueue_click,
+        redis_client,
+        link.id,
+        referrer,
+        user_agent,
+        ip_address,
     )
 
-    return RedirectResponse(url=link.original_url, status_code=status.HTTP_302_FOUND)  # type: ignore
+    return RedirectResponse(url=link.original_url, status_code=status.HTTP_302_FOUND)
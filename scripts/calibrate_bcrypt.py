@@ -0,0 +1,56 @@
+"""
+Find the bcrypt cost factor that fits a target hashing time on this machine.
+
+Each extra round doubles the work, so the right value depends on the
+hardware the app runs on. Run this on the deployment box and put the
+result in BCRYPT_ROUNDS.
+
+Usage:
+    python scripts/calibrate_bcrypt.py --target-ms 100
+
+Rounds below 10 are not safe for production, so the search never goes lower.
+"""
+
+import argparse
+import time
+
+import bcrypt
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+
+
+def time_hash(rounds: int, samples: int = 3) -> float:
+    """Return the average time in milliseconds to hash with the given rounds."""
+    salt = bcrypt.gensalt(rounds=rounds)
+    start = time.perf_counter()
+    for _ in range(samples):
+        bcrypt.hashpw(b"calibration-password", salt)
+    return (time.perf_counter() - start) / samples * 1000
+
+
+def calibrate(target_ms: float) -> int:
+    """Binary search for the highest rounds value that stays within target_ms."""
+    low, high = MIN_ROUNDS, MAX_ROUNDS
+    best = MIN_ROUNDS
+
+    while low <= high:
+        rounds = (low + high) // 2
+        elapsed = time_hash(rounds)
+        print(f"rounds={rounds}: {elapsed:.1f} ms")
+
+        if elapsed <= target_ms:
+            best = rounds
+            low = rounds + 1
+        else:
+            high = rounds - 1
+
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    print(f"BCRYPT_ROUNDS={calibrate(args.target_ms)}")
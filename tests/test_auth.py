@@ -33,6 +33,22 @@ def test_register_duplicate_username(client, test_user):
     assert response.status_code == 409
 
 
+def test_register_duplicate_email(client, test_user):
+    """Test that registering with an existing email fails"""
+
+    response = client.post(
+        "/auth/register",
+        json={
+            "username": "differentuser",
+            "email": test_user["email"],
+            "password": "password123",
+        },
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already registered"
+
+
 def test_login_success(client, test_user):
     """Test that a user can login with correct credentials"""
 
@@ -56,3 +72,10 @@ def test_login_invalid_password(client, test_user):
         json={"username": test_user["username"], "password": "wrong_password"},
     )
     assert response.status_code == 401
+
+
+def test_invalid_token_rejected(client):
+    """Test that a malformed token is rejected"""
+
+    response = client.get("/links", headers={"Authorization": "Bearer not-a-jwt"})
+    assert response.status_code == 401
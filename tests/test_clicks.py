@@ -1,4 +1,13 @@
-def test_multiple_clicks_recorded(authenticated_client):
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from redis import asyncio as aioredis
+
+import click_buffer
+
+
+def test_multiple_clicks_recorded(authenticated_client, flush_clicks):
     """Test that multiple visits create multiple click records"""
 
     link_response = authenticated_client.post(
@@ -12,13 +21,35 @@ def test_multiple_clicks_recorded(authenticated_client):
     for _ in range(3):
         authenticated_client.get(f"/{short_code}", follow_redirects=False)
 
+    flush_clicks()
     clicks_response = authenticated_client.get(f"/clicks/{link_id}")
     assert clicks_response.status_code == 200
     clicks = clicks_response.json()
     assert len(clicks) == 3
 
 
-def test_click_stats(authenticated_client):
+def test_clicks_pagination(authenticated_client, flush_clicks):
+    """Test that click records can be paged through"""
+
+    link_response = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/"}
+    )
+    link_data = link_response.json()
+
+    for _ in range(3):
+        authenticated_client.get(f"/{link_data['short_code']}", follow_redirects=False)
+
+    flush_clicks()
+    first_page = authenticated_client.get(f"/clicks/{link_data['id']}?limit=2")
+    assert first_page.status_code == 200
+    assert len(first_page.json()) == 2
+
+    second_page = authenticated_client.get(f"/clicks/{link_data['id']}?skip=2&limit=2")
+    assert second_page.status_code == 200
+    assert len(second_page.json()) == 1
+
+
+def test_click_stats(authenticated_client, flush_clicks):
     """Test aggregated click stats"""
 
     link_response = authenticated_client.post(
@@ -31,6 +62,7 @@ def test_click_stats(authenticated_client):
     for _ in range(5):
         authenticated_client.get(f"/{short_code}", follow_redirects=False)
 
+    flush_clicks()
     stats_response = authenticated_client.get(f"/clicks/stats")
     assert stats_response.status_code == 200
     stats = stats_response.json()
@@ -40,3 +72,130 @@ def test_click_stats(authenticated_client):
     assert stats["clicks_this_week"] == 5
     assert stats["clicks_this_month"] == 5
     assert isinstance(stats["top_referrers"], list)
+
+
+def test_click_stats_top_referrers(authenticated_client, flush_clicks):
+    """Test that top referrers are counted and ordered"""
+
+    link_response = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/"}
+    )
+    short_code = link_response.json()["short_code"]
+
+    for referrer in ["https://a.com", "https://b.com", "https://b.com", None]:
+        headers = {"referer": referrer} if referrer else {}
+        authenticated_client.get(
+            f"/{short_code}", headers=headers, follow_redirects=False
+        )
+
+    flush_clicks()
+    stats = authenticated_client.get("/clicks/stats").json()
+
+    assert stats["total_clicks"] == 4
+    assert stats["top_referrers"] == [
+        {"referrer": "https://b.com", "count": 2},
+        {"referrer": "https://a.com", "count": 1},
+    ]
+
+
+def test_click_stats_cached(authenticated_client, flush_clicks):
+    """Test that a second stats request is served from cache"""
+
+    link_response = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/"}
+    )
+    short_code = link_response.json()["short_code"]
+    authenticated_client.get(f"/{short_code}", follow_redirects=False)
+
+    flush_clicks()
+    first = authenticated_client.get("/clicks/stats")
+    assert first.status_code == 200
+
+    # Clicks recorded after the first request aren't visible until the cache expires
+    authenticated_client.get(f"/{short_code}", follow_redirects=False)
+
+    flush_clicks()
+    second = authenticated_client.get("/clicks/stats")
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert second.json()["total_clicks"] == 1
+
+
+def test_click_stats_invalidated_on_delete(authenticated_client, flush_clicks):
+    """Test that deleting a link clears the cached stats"""
+
+    link_response = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/"}
+    )
+    link_data = link_response.json()
+    authenticated_client.get(f"/{link_data['short_code']}", follow_redirects=False)
+    flush_clicks()
+
+    stats = authenticated_client.get("/clicks/stats").json()
+    assert stats["total_clicks"] == 1
+
+    delete_response = authenticated_client.delete(f"/links/{link_data['id']}")
+    assert delete_response.status_code == 204
+
+    stats = authenticated_client.get("/clicks/stats").json()
+    assert stats["total_clicks"] == 0
+
+
+def test_buffered_clicks_skip_deleted_links(authenticated_client, flush_clicks):
+    """Test that clicks buffered for a since-deleted link don't block the batch"""
+
+    kept = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/kept"}
+    ).json()
+    deleted = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/deleted"}
+    ).json()
+
+    authenticated_client.get(f"/{deleted['short_code']}", follow_redirects=False)
+    authenticated_client.get(f"/{kept['short_code']}", follow_redirects=False)
+    authenticated_client.delete(f"/links/{deleted['id']}")
+
+    flush_clicks()
+    clicks = authenticated_client.get(f"/clicks/{kept['id']}").json()
+    assert len(clicks) == 1
+
+
+def test_bad_buffered_click_is_dead_lettered(
+    authenticated_client, flush_clicks, test_redis
+):
+    """Test that a click that can't be stored doesn't block the ones after it"""
+
+    link_data = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/"}
+    ).json()
+
+    test_redis.xadd(
+        click_buffer.CLICK_STREAM_KEY,
+        {"link_id": "not-a-number", "clicked_at": "2026-01-01T00:00:00+00:00"},
+    )
+    authenticated_client.get(f"/{link_data['short_code']}", follow_redirects=False)
+
+    async def _retry():
+        redis_client = aioredis.Redis(
+            host="localhost",
+            port=6379,
+            db=test_redis.connection_pool.connection_kwargs["db"],
+            decode_responses=True,
+        )
+        try:
+            await click_buffer.ensure_click_group(redis_client)
+            with pytest.raises(ValueError):
+                await click_buffer.flush_clicks(redis_client, "test")
+            return await click_buffer.retry_pending_clicks(redis_client, "test")
+        finally:
+            await redis_client.aclose()
+
+    with patch("click_buffer.CLICK_MAX_DELIVERIES", 1):
+        still_pending = asyncio.run(_retry())
+
+    assert still_pending is False
+    assert test_redis.xlen(click_buffer.CLICK_DEAD_LETTER_KEY) == 1
+
+    flush_clicks()
+    clicks = authenticated_client.get(f"/clicks/{link_data['id']}").json()
+    assert len(clicks) == 1
@@ -36,6 +36,62 @@ def test_custom_link(authenticated_client):
     assert response_data["custom_code"] == True
 
 
+def test_custom_link_conflict(authenticated_client):
+    """Test that a custom code already in use is rejected"""
+
+    payload = {"original_url": "https://example.com/", "custom_code": "taken123"}
+
+    first = authenticated_client.post("/links", json=payload)
+    assert first.status_code == 201
+
+    second = authenticated_client.post("/links", json=payload)
+    assert second.status_code == 409
+
+
+def test_custom_link_stale_short_code_set(authenticated_client, test_redis):
+    """Test that a code left in the Redis set without a row can still be used"""
+
+    test_redis.sadd("shortcodes:all", "stale123")
+
+    response = authenticated_client.post(
+        "/links",
+        json={"original_url": "https://example.com/", "custom_code": "stale123"},
+    )
+    assert response.status_code == 201
+
+
+def test_custom_link_invalid_format(authenticated_client):
+    """Test that custom codes outside ASCII letters and digits are rejected"""
+
+    for custom_code in ["my-link", "café1", "abc\n"]:
+        response = authenticated_client.post(
+            "/links",
+            json={"original_url": "https://example.com/", "custom_code": custom_code},
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid custom code format"
+
+
+def test_get_links(authenticated_client):
+    """Test that a user's links are listed newest first and paginated"""
+
+    for code in ["first1", "second2", "third3"]:
+        response = authenticated_client.post(
+            "/links",
+            json={"original_url": "https://example.com/", "custom_code": code},
+        )
+        assert response.status_code == 201
+
+    response = authenticated_client.get("/links?limit=2")
+    assert response.status_code == 200
+    links = response.json()
+    assert [link["short_code"] for link in links] == ["third3", "second2"]
+    assert "created_at" in links[0]
+
+    response = authenticated_client.get("/links?skip=2")
+    assert [link["short_code"] for link in response.json()] == ["first1"]
+
+
 def test_collision_retry_logic(authenticated_client, db_session):
 
     blocker_code = "TAKEN1"
@@ -48,7 +104,9 @@ def test_collision_retry_logic(authenticated_client, db_session):
     db_session.add(blocker_link)
     db_session.commit()
 
-    with patch("routers.links.generate_short_code", side_effect=["TAKEN1", "WORKS2"]):
+    with patch(
+        "routers.links.generate_short_code", side_effect=["TAKEN1", "WORKS2", "WORKS3"]
+    ):
         response = authenticated_client.post(
             "/links", json={"original_url": "https://example.com/"}
         )
@@ -62,6 +120,23 @@ def test_collision_retry_logic(authenticated_client, db_session):
     assert len(links) == 2
 
 
+def test_collision_skips_known_codes(authenticated_client, test_redis):
+    """Test that codes already in the Redis code set are never tried"""
+
+    test_redis.sadd("shortcodes:all", "KNOWN1")
+
+    with patch(
+        "routers.links.generate_short_code", side_effect=["KNOWN1", "FRESH2", "FRESH3"]
+    ):
+        response = authenticated_client.post(
+            "/links", json={"original_url": "https://example.com/"}
+        )
+
+    assert response.status_code == 201
+    assert response.json()["short_code"] == "FRESH2"
+    assert test_redis.sismember("shortcodes:all", "FRESH2")
+
+
 def test_collision_max_retries(authenticated_client, db_session):
     """Test that we get 500 error after 3 failed collision attempts"""
 
@@ -84,3 +159,54 @@ def test_collision_max_retries(authenticated_client, db_session):
 
     assert response.status_code == 500
     assert "Could not generate unique short code" in response.json()["detail"]
+
+
+def test_delete_link_not_owner(authenticated_client, create_user_and_token):
+    """Test that users can't delete or read clicks for someone else's link"""
+
+    link_id = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/"}
+    ).json()["id"]
+
+    other_token = create_user_and_token("otheruser", "other@example.com", "otherpass1")
+    other_headers = {"Authorization": f"Bearer {other_token}"}
+
+    response = authenticated_client.delete(f"/links/{link_id}", headers=other_headers)
+    assert response.status_code == 403
+
+    response = authenticated_client.get(f"/clicks/{link_id}", headers=other_headers)
+    assert response.status_code == 403
+
+    response = authenticated_client.delete(f"/links/{link_id}")
+    assert response.status_code == 204
+
+    response = authenticated_client.delete(f"/links/{link_id}")
+    assert response.status_code == 404
+
+
+def test_update_link(authenticated_client, create_user_and_token, test_redis):
+    """Test that owners can update a link and others get 403 or 404"""
+
+    link = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/"}
+    ).json()
+
+    other_token = create_user_and_token("otheruser", "other@example.com", "otherpass1")
+    other_headers = {"Authorization": f"Bearer {other_token}"}
+    update = {"original_url": "https://example.org/"}
+
+    response = authenticated_client.patch(
+        f"/links/{link['id']}", json=update, headers=other_headers
+    )
+    assert response.status_code == 403
+
+    response = authenticated_client.patch("/links/999999", json=update)
+    assert response.status_code == 404
+
+    response = authenticated_client.patch(f"/links/{link['id']}", json=update)
+    assert response.status_code == 200
+    assert response.json()["original_url"] == "https://example.org/"
+    assert response.json()["updated_at"] is not None
+    assert test_redis.hget(f"link:{link['short_code']}", "url") == (
+        "https://example.org/"
+    )
@@ -1,7 +1,7 @@
-import json
+from datetime import datetime, timedelta, timezone
 
 
-def test_redirect(authenticated_client):
+def test_redirect(authenticated_client, flush_clicks):
     """Test that a short code successfully redirects"""
 
     link_response = authenticated_client.post(
@@ -17,6 +17,7 @@ def test_redirect(authenticated_client):
     )
     assert redirect_response.status_code == 302
 
+    flush_clicks()
     clicks_response = authenticated_client.get(f"/clicks/{link_id}")
     assert clicks_response.status_code == 200
     clicks = clicks_response.json()
@@ -40,15 +41,110 @@ def test_redirect_uses_cache(authenticated_client, test_redis):
     assert redirect1.status_code == 302
 
     cache_key = f"link:{short_code}"
-    cached_data = test_redis.get(cache_key)
-    assert cached_data is not None
-
-    cache_dict = json.loads(cached_data)
-    assert cache_dict["url"] == "https://example.com/"
+    cached_data = test_redis.hgetall(cache_key)
+    assert cached_data["url"] == "https://example.com/"
 
     redirect2 = authenticated_client.get(f"/{short_code}", follow_redirects=False)
     assert redirect2.status_code == 302
     assert redirect1.headers["location"] == redirect2.headers["location"]
 
-    cached = test_redis.get(f"link:{short_code}")
-    assert cached is not None
+    assert test_redis.exists(cache_key)
+    assert test_redis.ttl(cache_key) > 0
+
+
+def test_redirect_expired_link(authenticated_client, test_redis):
+    """Test that an expired link returns 404 instead of redirecting"""
+
+    link_response = authenticated_client.post(
+        "/links",
+        json={
+            "original_url": "https://example.com/",
+            "expires_at": "2020-01-01T00:00:00Z",
+        },
+    )
+    short_code = link_response.json()["short_code"]
+
+    redirect_response = authenticated_client.get(
+        f"/{short_code}", follow_redirects=False
+    )
+    assert redirect_response.status_code == 404
+    assert redirect_response.json()["detail"] == "Link has expired"
+    assert not test_redis.exists(f"link:{short_code}")
+
+
+def test_cache_ttl_capped_at_expiry(authenticated_client, test_redis):
+    """Test that a cached link is evicted no later than the link expires"""
+
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+    link_response = authenticated_client.post(
+        "/links",
+        json={
+            "original_url": "https://example.com/",
+            "expires_at": expires_at.isoformat(),
+        },
+    )
+    short_code = link_response.json()["short_code"]
+
+    assert 0 < test_redis.ttl(f"link:{short_code}") <= 300
+
+
+def test_redirect_cache_miss(authenticated_client, test_redis):
+    """Test that a redirect falls back to the database and re-caches the link"""
+
+    link_response = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/"}
+    )
+    short_code = link_response.json()["short_code"]
+    test_redis.delete(f"link:{short_code}")
+
+    redirect_response = authenticated_client.get(
+        f"/{short_code}", follow_redirects=False
+    )
+    assert redirect_response.status_code == 302
+    assert redirect_response.headers["location"] == "https://example.com/"
+    assert test_redis.hget(f"link:{short_code}", "url") == "https://example.com/"
+
+    missing_response = authenticated_client.get("/nope42", follow_redirects=False)
+    assert missing_response.status_code == 404
+
+
+def test_cached_code_does_not_shadow_routes(authenticated_client, test_redis):
+    """Test that a cached code matching a static route doesn't hijack it"""
+
+    test_redis.hset("link:health", mapping={"id": 1, "url": "https://example.com/"})
+
+    response = authenticated_client.get("/health", follow_redirects=False)
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
+
+
+def test_cached_redirect_with_cors(authenticated_client):
+    """Test that a cache hit from another origin still gets CORS headers"""
+
+    short_code = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/a b"}
+    ).json()["short_code"]
+
+    for _ in range(2):
+        response = authenticated_client.get(
+            f"/{short_code}",
+            headers={"origin": "https://app.example.com"},
+            follow_redirects=False,
+        )
+        assert response.status_code == 302
+        assert response.headers["location"] == "https://example.com/a%20b"
+        assert response.headers["access-control-allow-origin"] == "*"
+
+
+def test_redirect_replaces_string_cache_entry(authenticated_client, test_redis):
+    """Test that an entry in the old JSON string format is treated as a miss"""
+
+    short_code = authenticated_client.post(
+        "/links", json={"original_url": "https://example.com/"}
+    ).json()["short_code"]
+    test_redis.set(f"link:{short_code}", '{"id": 1, "url": "https://stale.com/"}')
+
+    response = authenticated_client.get(f"/{short_code}", follow_redirects=False)
+    assert response.status_code == 302
+    assert response.headers["location"] == "https://example.com/"
+    assert test_redis.hget(f"link:{short_code}", "url") == "https://example.com/"
@@ -1,27 +1,69 @@
-import random
+import os
+import re
 import string
+from itertools import product
 
 from better_profanity import profanity
 
+BASE62_ALPHABET = string.ascii_letters + string.digits
+
+# Maps each random byte straight to a base62 character. Bytes 248-255 are
+# dropped so every character stays equally likely (248 = 4 * 62).
+_BYTE_TO_BASE62 = bytes(ord(BASE62_ALPHABET[b % 62]) for b in range(256))
+_REJECTED_BYTES = bytes(range(248, 256))
+
+MIN_CUSTOM_CODE_LENGTH = 3
+MAX_CUSTOM_CODE_LENGTH = 10
+
+# Length and character checks in one C-level scan. ASCII only, unlike
+# str.isalnum, so codes stay within the base62 alphabet.
+_CUSTOM_CODE_RE = re.compile(
+    rf"[A-Za-z0-9]{{{MIN_CUSTOM_CODE_LENGTH},{MAX_CUSTOM_CODE_LENGTH}}}"
+)
+
+
+def _build_profane_codes() -> frozenset[str]:
+    """Expand the profanity wordlist into every alphanumeric code it censors.
+
+    better_profanity matches whole words, including leetspeak variants, so a
+    code containing no separators is profane only when it equals one of these.
+    """
+
+    char_map = {
+        char: tuple(sub for sub in subs if sub.isalnum())
+        for char, subs in profanity.CHARS_MAPPING.items()
+    }
+    codes = set()
+    for word in map(str, profanity.CENSOR_WORDSET):
+        if not word.isalnum():
+            continue
+        if not MIN_CUSTOM_CODE_LENGTH <= len(word) <= MAX_CUSTOM_CODE_LENGTH:
+            continue
+        options = (char_map.get(char, (char,)) for char in word)
+        codes.update("".join(variant) for variant in product(*options))
+
+    return frozenset(codes)
+
+
+_PROFANE_CODES = _build_profane_codes()
+
 
 def generate_short_code(length: int = 6) -> str:
     """Generate a random base62-encoded short code."""
 
-    alphabet = string.ascii_letters + string.digits
+    code = b""
+    while len(code) < length:
+        code += os.urandom(length).translate(_BYTE_TO_BASE62, _REJECTED_BYTES)
 
-    return "".join(random.choices(alphabet, k=length))
+    return code[:length].decode("ascii")
 
 
 def is_valid_custom_code(code: str) -> bool:
     """Validate a user-provided custom short code"""
 
-    if not code:
-        return False
-    if len(code) < 3 or len(code) > 10:
-        return False
-    if not code.isalnum():
+    if not _CUSTOM_CODE_RE.fullmatch(code):
         return False
-    if profanity.contains_profanity(code):
+    if code.lower() in _PROFANE_CODES:
         return False
 
     return True